@@ -1,14 +1,43 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse
-from middlewares import add_cors_middleware
-from routers import books, users
+from middlewares import add_middlewares
+from modules import dbmodule
+from routers import books, branches, health, users
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    for engine in dbmodule.get_engines():
+        try:
+            # a KeyStorageMismatchError is not caught, the app refuses to start
+            await run_in_threadpool(dbmodule.check_key_storage, engine)
+            warmed = await run_in_threadpool(dbmodule.warm_pool, engine)
+            logger.info("Pre-warmed %d connections to %s", warmed, engine.url)
+        except SQLAlchemyError as e:
+            # keep serving; /health/ready reports the database state until it recovers
+            logger.warning("Could not pre-warm pool for %s: %s", engine.url, e)
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    dbmodule.dispose_engine()
+
 
-app = FastAPI()
-add_cors_middleware(app)
+app = FastAPI(lifespan=lifespan)
+add_middlewares(app)
 
 
 app.include_router(books.router)
 app.include_router(users.router)
+app.include_router(branches.router)
+app.include_router(health.router)
 
 
 @app.get("/")
@@ -1,8 +1,49 @@
+import hashlib
+import logging
+import os
+import random
+import re
+import time
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from modules import dbmodule
+from modules.idempotency import (
+    DatabaseIdempotencyStore,
+    InMemoryIdempotencyStore,
+    StoredResponse,
+)
+from modules.profiling import RequestProfiler
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
 
 _CORS_ORIGINS = ["*"]
 
+IDEMPOTENCY_BACKEND = os.getenv("IDEMPOTENCY_BACKEND", "memory")  # memory | database
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+# a key reserved by a request that never finished (worker killed) is freed after this
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+_IDEMPOTENCY_HEADER = b"idempotency-key"
+_BRANCH_HEADER = b"x-library-branch"
+_IDEMPOTENT_ROUTES = [
+    ("POST", re.compile(r"^/books/$")),
+    ("POST", re.compile(r"^/users/$")),
+    ("PATCH", re.compile(r"^/books/[^/]+$")),
+]
+_MAX_KEY_LENGTH = 255
+
+# profiling is off unless one of the triggers below is enabled
+PROFILE_HEADER_ENABLED = os.getenv("PROFILE_HEADER_ENABLED", "false").lower() == "true"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/library-api-profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+
+_PROFILE_HEADER = b"x-profile"
+
 
 def add_cors_middleware(app: FastAPI):
     cors_origins = _CORS_ORIGINS
@@ -16,5 +57,230 @@ def add_cors_middleware(app: FastAPI):
     )
 
 
+class IdempotencyMiddleware:
+    """
+    Replays the stored response for a repeated `Idempotency-Key` instead of
+    running the route again.
+
+    The key is scoped to branch, method and path. Reusing a key with a
+    different body gives 422, and a retry arriving while the first request is
+    still running gives 409. Server errors (5xx) are not stored so they can be retried.
+    """
+
+    def __init__(self, app, store, routes=_IDEMPOTENT_ROUTES):
+        self.app = app
+        self.store = store
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._is_idempotent_route(scope):
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        key = headers.get(_IDEMPOTENCY_HEADER)
+        if key is None:
+            return await self.app(scope, receive, send)
+        if not key or len(key) > _MAX_KEY_LENGTH:
+            return await JSONResponse(
+                status_code=400, content={"detail": "Invalid Idempotency-Key header"}
+            )(scope, receive, send)
+
+        body = await _read_body(receive)
+        # a request without the header is served by the default branch
+        branch = headers.get(_BRANCH_HEADER, b"").decode("latin-1")
+        branch = branch or dbmodule.DEFAULT_BRANCH
+        # path and branch are unbounded, a digest keeps the stored key a fixed size
+        store_key = hashlib.sha256(
+            "\0".join(
+                (branch, scope["method"], scope["path"], key.decode("latin-1"))
+            ).encode("utf-8")
+        ).hexdigest()
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        record = await self._call_store("get", store_key)
+        if record is None and not await self._call_store(
+            "reserve", store_key, fingerprint
+        ):
+            record = await self._call_store("get", store_key)
+        if record is not None:
+            return await self._replay(record, fingerprint, scope, receive, send)
+
+        response = StoredResponse(fingerprint=fingerprint)
+        body_parts = []
+
+        body_sent = False
+
+        async def replay_receive():
+            # the body was consumed above; hand it over once, then pass through
+            # so the app still sees http.disconnect
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response.status_code = message["status"]
+                response.headers = [
+                    (k.decode("latin-1"), v.decode("latin-1"))
+                    for k, v in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                body_parts.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await self._call_store("release", store_key)
+            raise
+
+        if response.status_code is None or response.status_code >= 500:
+            await self._call_store("release", store_key)
+        else:
+            response.body = b"".join(body_parts)
+            await self._call_store("save", store_key, response)
+
+    def _is_idempotent_route(self, scope) -> bool:
+        method, path = scope["method"], scope["path"]
+        return any(m == method and p.match(path) for m, p in self.routes)
+
+    async def _call_store(self, name, *args):
+        method = getattr(self.store, name)
+        if self.store.blocking:
+            return await run_in_threadpool(method, *args)
+        return method(*args)
+
+    async def _replay(self, record: StoredResponse, fingerprint, scope, receive, send):
+        if record.fingerprint != fingerprint:
+            response = JSONResponse(
+                status_code=422,
+                content={
+                    "detail": "Idempotency-Key was already used with a different request body"
+                },
+            )
+        elif record.pending:
+            response = JSONResponse(
+                status_code=409,
+                content={
+                    "detail": "A request with this Idempotency-Key is in progress"
+                },
+            )
+        else:
+            headers = [
+                (k.encode("latin-1"), v.encode("latin-1")) for k, v in record.headers
+            ]
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": record.status_code,
+                    "headers": headers + [(b"idempotent-replayed", b"true")],
+                }
+            )
+            await send({"type": "http.response.body", "body": record.body})
+            return
+        await response(scope, receive, send)
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+class ProfilingMiddleware:
+    """
+    Records a call-stack profile of a request when it carries `X-Profile: 1`
+    (if `header_enabled`) or is picked by `sample_rate`.
+
+    Every request is counted while in flight, so each profile records the
+    highest number of other requests whose work may appear in it.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler, header_enabled, sample_rate):
+        self.app = app
+        self.profiler = profiler
+        self.header_enabled = header_enabled
+        self.sample_rate = sample_rate
+        # only touched from the event loop thread, no locking needed
+        self._in_flight = 0
+        self._peak_in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        try:
+            if self._should_profile(scope):
+                await self._profile(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            self._in_flight -= 1
+
+    async def _profile(self, scope, receive, send):
+        profile = self.profiler.start()
+        if profile is None:
+            return await self.app(scope, receive, send)
+        self._peak_in_flight = self._in_flight
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            target = self.profiler.stop(
+                profile,
+                scope["method"],
+                scope["path"],
+                time.perf_counter() - started,
+                concurrent=self._peak_in_flight - 1,
+            )
+            logger.info(
+                "Profile of %s %s written to %s", scope["method"], scope["path"], target
+            )
+
+    def _should_profile(self, scope) -> bool:
+        if self.header_enabled and dict(scope["headers"]).get(_PROFILE_HEADER) == b"1":
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+
+def make_idempotency_store(backend: str = IDEMPOTENCY_BACKEND):
+    if backend == "memory":
+        return InMemoryIdempotencyStore(
+            ttl_seconds=IDEMPOTENCY_TTL_SECONDS,
+            max_entries=IDEMPOTENCY_MAX_ENTRIES,
+            lock_seconds=IDEMPOTENCY_LOCK_SECONDS,
+        )
+    if backend == "database":
+        return DatabaseIdempotencyStore(
+            ttl_seconds=IDEMPOTENCY_TTL_SECONDS, lock_seconds=IDEMPOTENCY_LOCK_SECONDS
+        )
+    raise ValueError(f"Unknown idempotency backend {backend!r}")
+
+
+def add_idempotency_middleware(app: FastAPI):
+    app.add_middleware(IdempotencyMiddleware, store=make_idempotency_store())
+
+
+def add_profiling_middleware(app: FastAPI):
+    if not PROFILE_HEADER_ENABLED and PROFILE_SAMPLE_RATE <= 0:
+        return
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiler=RequestProfiler(PROFILE_DIR, PROFILE_MAX_FILES),
+        header_enabled=PROFILE_HEADER_ENABLED,
+        sample_rate=PROFILE_SAMPLE_RATE,
+    )
+
+
 def add_middlewares(app: FastAPI):
+    # added last so CORS stays the outermost layer
+    add_idempotency_middleware(app)
+    add_profiling_middleware(app)
     add_cors_middleware(app)
@@ -0,0 +1,181 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from . import dbmodule
+
+
+def _utcnow() -> datetime:
+    # naive UTC, matching the TIMESTAMP column
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status_code: Optional[int] = None  # None while the first request is in flight
+    headers: List[Tuple[str, str]] = field(default_factory=list)
+    body: bytes = b""
+
+    @property
+    def pending(self) -> bool:
+        return self.status_code is None
+
+
+class InMemoryIdempotencyStore:
+    """
+    Bounded LRU store with per-entry TTL. Entries are local to the process, so
+    with several workers retries are only deduplicated when they land on the
+    same worker; use the database store for that.
+
+    A reservation that was never saved or released is treated as free after
+    `lock_seconds`.
+    """
+
+    blocking = False
+
+    def __init__(self, ttl_seconds: float, max_entries: int, lock_seconds: float = 60):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.lock_seconds = lock_seconds
+        self._entries: "OrderedDict[str, Tuple[float, StoredResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, record = item
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return record
+
+    def reserve(self, key: str, fingerprint: str) -> bool:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[0] > time.monotonic():
+                return False
+            self._put(key, StoredResponse(fingerprint=fingerprint), self.lock_seconds)
+            return True
+
+    def save(self, key: str, response: StoredResponse):
+        with self._lock:
+            self._put(key, response, self.ttl)
+
+    def release(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _put(self, key: str, record: StoredResponse, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, record)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class DatabaseIdempotencyStore:
+    """
+    Store backed by the `idempotency_keys` table, shared by all workers.
+    Expired rows are purged whenever a response is saved.
+
+    A pending row (no status code yet) is left behind when its worker dies
+    mid-request; it is treated as free once older than `lock_seconds`.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        database: Optional[dbmodule.Database] = None,
+        lock_seconds: float = 60,
+    ):
+        self.ttl = ttl_seconds
+        self.lock_seconds = lock_seconds
+        self._database = database
+
+    @property
+    def database(self) -> dbmodule.Database:
+        # resolved on first use, so building the middleware does not create the engine
+        if self._database is None:
+            self._database = dbmodule.Database()
+        return self._database
+
+    def _expired(self):
+        """
+        Condition matching rows that no longer hold their key: stored
+        responses past the TTL and pending reservations past the lock timeout.
+        """
+        now = _utcnow()
+        row = dbmodule.IdempotencyKey
+        return or_(
+            row.created_at <= now - timedelta(seconds=self.ttl),
+            and_(
+                row.status_code.is_(None),
+                row.created_at <= now - timedelta(seconds=self.lock_seconds),
+            ),
+        )
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        with self.database.session() as db:
+            row = db.scalar(
+                select(dbmodule.IdempotencyKey).where(
+                    dbmodule.IdempotencyKey.key == key, ~self._expired()
+                )
+            )
+            if row is None:
+                return None
+            return StoredResponse(
+                fingerprint=row.fingerprint,
+                status_code=row.status_code,
+                headers=[tuple(h) for h in json.loads(row.headers or "[]")],
+                body=row.body or b"",
+            )
+
+    def reserve(self, key: str, fingerprint: str) -> bool:
+        try:
+            with self.database.session() as db:
+                # an expired row for the same key would otherwise block the insert
+                db.execute(
+                    delete(dbmodule.IdempotencyKey).where(
+                        dbmodule.IdempotencyKey.key == key, self._expired()
+                    )
+                )
+                db.add(
+                    dbmodule.IdempotencyKey(
+                        key=key, fingerprint=fingerprint, created_at=_utcnow()
+                    )
+                )
+        except IntegrityError:
+            return False
+        return True
+
+    def save(self, key: str, response: StoredResponse):
+        with self.database.session() as db:
+            row = db.get(dbmodule.IdempotencyKey, key)
+            if row is None:
+                row = dbmodule.IdempotencyKey(key=key, created_at=_utcnow())
+                db.add(row)
+            row.fingerprint = response.fingerprint
+            row.status_code = response.status_code
+            row.headers = json.dumps(response.headers)
+            row.body = response.body
+            db.execute(delete(dbmodule.IdempotencyKey).where(self._expired()))
+
+    def release(self, key: str):
+        with self.database.session() as db:
+            db.execute(
+                delete(dbmodule.IdempotencyKey).where(
+                    dbmodule.IdempotencyKey.key == key
+                )
+            )
@@ -0,0 +1,145 @@
+import cProfile
+import json
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+slow_query_logger = logging.getLogger("slow_queries")
+
+
+class RequestProfiler:
+    """
+    Records cProfile call-stack profiles into `directory`, keeping only the
+    newest `max_files`. Profiles can be opened with `python -m pstats` or
+    snakeviz.
+
+    cProfile records everything the event loop thread runs, so a profile also
+    contains work done for other requests in flight at the same time; the
+    caller passes how many there were and it is kept in the file name. Only
+    one profile per process runs at a time because profilers cannot be nested.
+    """
+
+    def __init__(self, directory: Path, max_files: int):
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """
+        Returns:
+            cProfile.Profile: Running profile, or None if one is already active.
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # another profiler (debugger, coverage) owns the hook
+            self._lock.release()
+            return None
+        return profile
+
+    def stop(
+        self,
+        profile: cProfile.Profile,
+        method: str,
+        path: str,
+        duration: float,
+        concurrent: int = 0,
+    ):
+        """
+        Save `profile` and return its path. `concurrent` is the highest number
+        of other requests in flight while it was recorded.
+        """
+        try:
+            profile.disable()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+            slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+            target = self.directory / (
+                f"{stamp}-{method}-{slug}-{duration * 1e3:.0f}ms"
+                f"-{concurrent}concurrent.prof"
+            )
+            profile.dump_stats(target)
+            self._rotate()
+            return target
+        finally:
+            self._lock.release()
+
+    def _rotate(self):
+        files = sorted(self.directory.glob("*.prof"))
+        for old in files[: max(0, len(files) - self.max_files)]:
+            old.unlink(missing_ok=True)
+
+
+def _explain(cursor, dialect: str, statement: str, parameters) -> Optional[str]:
+    if dialect == "postgresql":
+        # ANALYZE executes the statement again, so only plain reads get it; a
+        # WITH query may hold a data-modifying CTE and gets the estimated plan
+        is_read = statement.lstrip().upper().startswith("SELECT")
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if is_read else "EXPLAIN "
+    elif dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    else:
+        return None
+    explain_cursor = cursor.connection.cursor()
+    try:
+        if dialect != "postgresql":
+            explain_cursor.execute(prefix + statement, parameters)
+            return _format_plan(explain_cursor.fetchall())
+        # EXPLAIN runs inside the request's transaction; a failure would abort
+        # it on Postgres, so it is undone through a savepoint
+        explain_cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            explain_cursor.execute(prefix + statement, parameters)
+            plan = _format_plan(explain_cursor.fetchall())
+        except Exception:
+            explain_cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            raise
+        explain_cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    finally:
+        explain_cursor.close()
+
+
+def _format_plan(rows) -> str:
+    return "\n".join(" ".join(str(col) for col in row) for row in rows)
+
+
+def install_slow_query_log(engine: Engine, threshold_ms: float, explain: bool = True):
+    """
+    Log every statement executed on `engine` that takes longer than
+    `threshold_ms`, with its parameters, duration and (on Postgres and SQLite)
+    the query plan, as one JSON object per record on the `slow_queries` logger.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _log_slow(conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1e3
+        if duration_ms < threshold_ms:
+            return
+        record = {
+            "duration_ms": round(duration_ms, 3),
+            "statement": statement,
+            "parameters": parameters,
+            "plan": None,
+        }
+        if explain and not executemany:
+            try:
+                record["plan"] = _explain(
+                    cursor, engine.dialect.name, statement, parameters
+                )
+            except Exception as e:
+                record["plan"] = f"EXPLAIN failed: {e}"
+        slow_query_logger.warning(json.dumps(record, default=str))
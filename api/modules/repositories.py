@@ -1,11 +1,38 @@
 from datetime import date
 from typing import Optional
 
-from sqlalchemy import exists
+from sqlalchemy import bindparam, exists, select
 from sqlalchemy.orm import Session
 
 from . import dbmodule, schemas
 
+# Hot lookups are built once with bound parameters; SQLAlchemy then reuses the
+# compiled form from its statement cache instead of rebuilding the query per call.
+_USER_BY_CARD_NUMBER = (
+    select(dbmodule.User)
+    .where(dbmodule.User.card_number == bindparam("card_number"))
+    .limit(1)
+)
+_USER_EXISTS = select(
+    exists().where(dbmodule.User.card_number == bindparam("card_number"))
+)
+_BOOKS_BY_BORROWER = select(dbmodule.Book).where(
+    dbmodule.Book.borrower_card_number == bindparam("card_number")
+)
+_BOOK_BY_SERIAL = (
+    select(dbmodule.Book)
+    .where(dbmodule.Book.serial_number == bindparam("serial"))
+    .limit(1)
+)
+
+# executed by dbmodule.warm_pool on startup; results are discarded
+HOT_STATEMENTS = [
+    (_USER_BY_CARD_NUMBER, {"card_number": "000000"}),
+    (_USER_EXISTS, {"card_number": "000000"}),
+    (_BOOKS_BY_BORROWER, {"card_number": "000000"}),
+    (_BOOK_BY_SERIAL, {"serial": "000000"}),
+]
+
 
 class UserNotFoundError(Exception):
     pass
@@ -31,11 +58,9 @@ class UserRepository:
         return self.session.query(dbmodule.User).all()
 
     def get_by_card_number(self, card_number: str):
-        return (
-            self.session.query(dbmodule.User)
-            .filter(dbmodule.User.card_number == card_number)
-            .first()
-        )
+        return self.session.scalars(
+            _USER_BY_CARD_NUMBER, {"card_number": card_number}
+        ).first()
 
     def add(self, user_data: schemas.UserCreate):
         user = dbmodule.User(**user_data.dict())
@@ -43,19 +68,13 @@ class UserRepository:
         return user
 
     def get_users_borrowed_books(self, user: dbmodule.User):
-        borrowed_books = (
-            self.session.query(dbmodule.Book)
-            .filter(dbmodule.Book.borrower_card_number == user.card_number)
-            .all()
-        )
+        borrowed_books = self.session.scalars(
+            _BOOKS_BY_BORROWER, {"card_number": user.card_number}
+        ).all()
         return borrowed_books
 
     def exists(self, card_number: str) -> bool:
-        return bool(
-            self.session.scalar(
-                exists().where(dbmodule.User.card_number == card_number).select()
-            )
-        )
+        return bool(self.session.scalar(_USER_EXISTS, {"card_number": card_number}))
 
     def delete(self, card_number: str) -> bool:
         user = self.get_by_card_number(card_number)
@@ -72,11 +91,7 @@ class BookRepository:
         return self.session.query(dbmodule.Book).all()
 
     def get_by_serial(self, serial: str):
-        return (
-            self.session.query(dbmodule.Book)
-            .filter(dbmodule.Book.serial_number == serial)
-            .first()
-        )
+        return self.session.scalars(_BOOK_BY_SERIAL, {"serial": serial}).first()
 
     def add(self, book_data: schemas.BookCreate):
         book = dbmodule.Book(**book_data.dict())
@@ -31,6 +31,10 @@ class BookResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class BranchBookResponse(BookResponse):
+    branch: str
+
+
 class BookCreateResponse(BaseModel):
     serial_number: str
 
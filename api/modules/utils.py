@@ -1,13 +1,26 @@
-import re
+KEY_LENGTH = 6  # serial and card numbers are exactly six ASCII digits
 
-serial_number_regex = r"^[0-9]{6}"
+
+def is_valid_key_number(value: str) -> bool:
+    # isascii() rules out other Unicode digits that isdigit() accepts
+    return len(value) == KEY_LENGTH and value.isascii() and value.isdigit()
 
 
 def is_valid_serial_number(serial_number: str) -> bool:
-    return re.fullmatch(pattern=serial_number_regex, string=serial_number) is not None
+    return is_valid_key_number(serial_number)
 
 
 def is_valid_card_number(card_number: str) -> bool:
-    return is_valid_serial_number(
+    return is_valid_key_number(
         card_number
     )  # assuming books and cards serials validation logic are same
+
+
+def key_to_int(value: str) -> int:
+    if not is_valid_key_number(value):
+        raise ValueError(f"{value!r} is not a {KEY_LENGTH} digit number")
+    return int(value)
+
+
+def int_to_key(value: int) -> str:
+    return f"{value:0{KEY_LENGTH}d}"
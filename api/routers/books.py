@@ -60,9 +60,8 @@ async def create_new_book(
 
     except IntegrityError as e:
         db.rollback()
-        if f"Key (serial_number)=({book_data.serial_number}) already exists" in str(
-            e.orig
-        ):
+        # integer keys are reported without leading zeros, so match the column only
+        if "Key (serial_number)=" in str(e.orig) and "already exists" in str(e.orig):
             raise HTTPException(
                 status_code=400,
                 detail=f"Book with serial number {book_data.serial_number} already exists",
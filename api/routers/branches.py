@@ -0,0 +1,72 @@
+import asyncio
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from modules import dbmodule, schemas
+from modules.repositories import BookRepository
+from sqlalchemy.exc import OperationalError
+
+router = APIRouter()
+
+
+def _branch_catalog(branch: str) -> List[schemas.BranchBookResponse]:
+    with dbmodule.Database(branch).session() as db:
+        # converted inside the session, committing expires the loaded books
+        return [
+            schemas.BranchBookResponse(
+                branch=branch, **schemas.BookResponse.model_validate(book).model_dump()
+            )
+            for book in BookRepository(db).get_all()
+        ]
+
+
+@router.get("/branches", response_model=List[str], tags=["BRANCHES"])
+async def get_branches():
+    """
+    Get names of all configured library branches.
+    """
+    return dbmodule.branches()
+
+
+@router.get(
+    "/branches/books",
+    response_model=List[schemas.BranchBookResponse],
+    tags=["BRANCHES"],
+)
+async def get_books_from_branches(branch: Optional[List[str]] = Query(None)):
+    """
+    Get books from several branches at once. Each branch database is queried
+    in parallel.
+
+    Args:
+        branch (List[str], optional): Branches to read, all branches by default.
+
+    Returns:
+        List[schemas.BranchBookResponse]: Books tagged with their branch.
+
+    Raises:
+        HTTPException(404): If a requested branch is not configured.
+        HTTPException(503): If any branch database cannot be read.
+    """
+    names = branch or dbmodule.branches()
+    unknown = [name for name in names if name not in dbmodule.SHARD_MAP]
+    if unknown:
+        raise HTTPException(
+            status_code=404, detail=f"Branch {', '.join(unknown)} not found"
+        )
+
+    results = await asyncio.gather(
+        *(run_in_threadpool(_branch_catalog, name) for name in names),
+        return_exceptions=True,
+    )
+    books = []
+    for name, result in zip(names, results):
+        if isinstance(result, OperationalError):
+            raise HTTPException(
+                status_code=503, detail=f"Could not fetch data from branch {name}"
+            )
+        if isinstance(result, BaseException):
+            raise result
+        books.extend(result)
+    return books
@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from modules import dbmodule
+
+# how long a database probe result is reused before the database is pinged again
+READINESS_CACHE_SECONDS = float(os.getenv("READINESS_CACHE_SECONDS", "2"))
+
+router = APIRouter(prefix="/health")
+
+
+class CachedProbe:
+    """
+    Database probe whose result is reused for `ttl` seconds, so frequent load
+    balancer checks do not each cost a round trip to the database.
+    """
+
+    def __init__(self, check, ttl: float = READINESS_CACHE_SECONDS):
+        self._check = check
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._result = None
+        self._checked_at = None
+
+    def __call__(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= self._ttl:
+                self._result = self._check()
+                self._checked_at = now
+            return self._result
+
+    def reset(self):
+        with self._lock:
+            self._checked_at = None
+
+
+readiness_probe = CachedProbe(lambda: dbmodule.ping())
+
+
+@router.get("/live", tags=["HEALTH"])
+async def live():
+    """
+    Liveness check, does not touch the database.
+    """
+    return {"status": "ok"}
+
+
+@router.get("/ready", tags=["HEALTH"])
+def ready(request: Request):
+    """
+    Readiness check. Only the default branch database decides readiness: every
+    instance serves every branch, so one unreachable branch database must not
+    take all instances out of the load balancer. The state of each branch is
+    reported in the body.
+
+    Returns:
+        200 once startup (pool warm-up) finished and the default branch
+        database answers.
+
+    Raises:
+        503: While starting up or when the default branch database is unreachable.
+    """
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    branches = readiness_probe()
+    content = {
+        "branches": {
+            branch: "ok" if ok else "unavailable" for branch, ok in branches.items()
+        }
+    }
+    if not branches.get(dbmodule.DEFAULT_BRANCH):
+        return JSONResponse(
+            status_code=503, content={"status": "database unavailable", **content}
+        )
+    return {"status": "ok", **content}
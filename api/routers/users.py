@@ -59,7 +59,8 @@ async def create_new_user(
         )
     except IntegrityError as e:
         db.rollback()
-        if f"Key (card_number)=({user_data.card_number}) already exists" in str(e.orig):
+        # integer keys are reported without leading zeros, so match the column only
+        if "Key (card_number)=" in str(e.orig) and "already exists" in str(e.orig):
             raise HTTPException(
                 status_code=400,
                 detail=f"User with card number {user_data.card_number} already exists",
@@ -0,0 +1,87 @@
+"""
+Per-call CPU of the hot repository lookups: legacy `session.query(...)` form
+versus the pre-built statements used by `modules.repositories`.
+
+    uv run python benchmarks/bench_lookups.py [--calls 5000] [--rows 10000]
+"""
+
+import argparse
+import time
+
+from seed import seed_database
+from sqlalchemy import create_engine, exists
+from sqlalchemy.orm import Session
+
+from modules import dbmodule
+from modules.repositories import BookRepository, UserRepository
+
+
+def legacy_get_by_serial(session, serial):
+    return (
+        session.query(dbmodule.Book)
+        .filter(dbmodule.Book.serial_number == serial)
+        .first()
+    )
+
+
+def legacy_get_by_card_number(session, card_number):
+    return (
+        session.query(dbmodule.User)
+        .filter(dbmodule.User.card_number == card_number)
+        .first()
+    )
+
+
+def legacy_exists(session, card_number):
+    return bool(
+        session.scalar(
+            exists().where(dbmodule.User.card_number == card_number).select()
+        )
+    )
+
+
+def cpu_per_call(fn, keys, calls: int, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        for i in range(calls):
+            fn(keys[i % len(keys)])
+        best = min(best, time.process_time() - start)
+    return best / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    seed_database(engine, books=args.rows, users=args.rows)
+    keys = [f"{i:06d}" for i in range(0, args.rows, max(1, args.rows // 100))]
+
+    with Session(engine) as session:
+        books, users = BookRepository(session), UserRepository(session)
+        cases = [
+            (
+                "get_by_serial",
+                lambda k: legacy_get_by_serial(session, k),
+                books.get_by_serial,
+            ),
+            (
+                "get_by_card_number",
+                lambda k: legacy_get_by_card_number(session, k),
+                users.get_by_card_number,
+            ),
+            ("exists", lambda k: legacy_exists(session, k), users.exists),
+        ]
+        print(f"{'lookup':<20}{'legacy us':>12}{'cached us':>12}{'speedup':>10}")
+        for name, legacy, cached in cases:
+            assert legacy(keys[0]) == cached(keys[0])
+            before = cpu_per_call(legacy, keys, args.calls)
+            after = cpu_per_call(cached, keys, args.calls)
+            print(f"{name:<20}{before:>12.1f}{after:>12.1f}{before / after:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Benchmark BookRepository and UserRepository against a seeded local database.
+
+    uv run python benchmarks/bench_repositories.py --books 100000 --output results.json
+    uv run python benchmarks/bench_repositories.py --compare results.json
+
+By default a throwaway SQLite file is used; pass --database-url to run against
+a local Postgres instead (its tables are dropped and recreated). Every
+operation is warmed up and then timed in --repeat batches; the batch with the
+lowest median is reported. With --compare the run exits with status 1 when an
+operation's median got slower than the baseline by more than --max-regression.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import sqlalchemy
+from seed import number, seed_database
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from modules import dbmodule, schemas
+from modules.repositories import BookRepository, UserRepository
+
+
+def _timings(fn, calls: int) -> list:
+    samples = []
+    # like timeit, keep garbage collection pauses out of the measurement
+    gc.collect()
+    gc.disable()
+    try:
+        for i in range(calls):
+            start = time.perf_counter()
+            fn(i)
+            samples.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return samples
+
+
+def _summary(samples: list) -> dict:
+    if not samples:
+        return {"calls": 0}
+    ordered = sorted(samples)
+    return {
+        "calls": len(samples),
+        "mean_us": statistics.fmean(samples) * 1e6,
+        "p50_us": ordered[len(ordered) // 2] * 1e6,
+        "p95_us": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1e6,
+        "min_us": ordered[0] * 1e6,
+    }
+
+
+# Each benchmark sets up its data and returns run(calls) -> list of timings, so
+# the runner can warm it up and repeat it.
+
+
+def bench_get_all(engine, args, rng):
+    def op(_):
+        with Session(engine) as session:
+            BookRepository(session).get_all()
+
+    return lambda calls: _timings(op, calls)
+
+
+def bench_get_by_serial(engine, args, rng):
+    def run(calls):
+        with Session(engine) as session:
+            repo = BookRepository(session)
+
+            def op(_):
+                repo.get_by_serial(number(rng.randrange(args.books)))
+                # drop loaded objects so every call hydrates rows like a fresh request
+                session.expunge_all()
+
+            return _timings(op, calls)
+
+    return run
+
+
+def bench_borrow_return(engine, args, rng):
+    with Session(engine) as session:
+        available = session.scalars(
+            select(dbmodule.Book.serial_number).where(
+                dbmodule.Book.is_borrowed.is_(False)
+            )
+        ).all()
+    borrow = schemas.BookStatusUpdate(
+        is_borrowed=True,
+        borrower_card_number=number(0),
+        borrowed_date=date(2024, 1, 1),
+    )
+    give_back = schemas.BookStatusUpdate(is_borrowed=False)
+
+    def run(calls):
+        with Session(engine) as session:
+            books, users = BookRepository(session), UserRepository(session)
+
+            def op(_):
+                serial = rng.choice(available)
+                books.update_book_status(serial, borrow, user_repo=users)
+                session.commit()
+                books.update_book_status(serial, give_back, user_repo=users)
+                session.commit()
+
+            return _timings(op, calls)
+
+    return run
+
+
+def bench_delete_user(engine, args, rng):
+    # same steps as DELETE /users/{card_number}: return borrowed books, then delete;
+    # every run takes users from one shuffled pool so none is deleted twice, main()
+    # makes sure the pool covers warm-up and all repeats
+    remaining = rng.sample(range(args.users), args.users)
+
+    def run(calls):
+        with Session(engine) as session:
+            books, users = BookRepository(session), UserRepository(session)
+
+            def op(_):
+                user = users.get_by_card_number(number(remaining.pop()))
+                for book in users.get_users_borrowed_books(user):
+                    books.return_book(book)
+                users.delete(user.card_number)
+                session.commit()
+
+            return _timings(op, calls)
+
+    return run
+
+
+def measure(run, calls: int, warmup: int, repeat: int) -> dict:
+    """
+    Run `warmup` untimed calls, then `repeat` timed batches of `calls`, and
+    keep the batch with the lowest median; the fastest batch is the one least
+    disturbed by the rest of the machine.
+    """
+    run(min(warmup, calls))
+    batches = [_summary(run(calls)) for _ in range(repeat)]
+    best = min(batches, key=lambda batch: batch["p50_us"])
+    return dict(best, repeats=len(batches))
+
+
+def users_for_deletes(args) -> int:
+    """
+    Returns:
+        int: Users delete_user removes over its warm-up and timed batches.
+    """
+    return min(args.warmup, args.delete_calls) + args.repeat * args.delete_calls
+
+
+BENCHMARKS = {
+    "get_all": bench_get_all,
+    "get_by_serial": bench_get_by_serial,
+    "borrow_return": bench_borrow_return,
+    "delete_user": bench_delete_user,
+}
+
+
+# results are only comparable when measured on the same kind and size of database
+COMPARED_META = ("dialect", "books", "users")
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list:
+    """
+    Returns:
+        list: Messages for operations whose median regressed past the threshold.
+
+    Raises:
+        SystemExit: If the baseline was measured on a different setup.
+    """
+    differences = [
+        f"{key} {baseline['meta'].get(key)} -> {results['meta'][key]}"
+        for key in COMPARED_META
+        if baseline["meta"].get(key) != results["meta"][key]
+    ]
+    if differences:
+        raise SystemExit(
+            "baseline was measured on a different setup: " + ", ".join(differences)
+        )
+    print(f"\n{'operation':<16}{'base p50':>12}{'p50':>12}{'ratio':>10}")
+    failures = []
+    for name, current in results["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        ratio = current["p50_us"] / before["p50_us"]
+        status = "REGRESSION" if ratio > 1 + max_regression else "ok"
+        print(
+            f"{name:<16}{before['p50_us']:>12.1f}{current['p50_us']:>12.1f}"
+            f"{ratio:>9.2f}x  {status}"
+        )
+        if status != "ok":
+            failures.append(f"{name} p50 is {ratio:.2f}x the baseline")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[1],
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument(
+        "--users",
+        type=int,
+        help="defaults to books / 10, raised to what delete_user needs",
+    )
+    parser.add_argument("--borrowed-ratio", type=float, default=0.1)
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--get-all-calls", type=int, default=20)
+    parser.add_argument("--delete-calls", type=int, default=100)
+    parser.add_argument(
+        "--warmup", type=int, default=20, help="untimed calls before measuring"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="timed batches, the fastest is kept"
+    )
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--compare", type=Path, help="baseline results JSON")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+    # sized the same whatever --only selects, so partial runs stay comparable
+    deletes = users_for_deletes(args)
+    if args.users is None:
+        args.users = max(1, args.books // 10, deletes)
+    elif args.users < deletes and "delete_user" in (args.only or BENCHMARKS):
+        parser.error(
+            f"delete_user needs {deletes} users for --warmup and --repeat batches "
+            "of --delete-calls; raise --users or lower --delete-calls"
+        )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{tmp}/bench.db"
+        engine = create_engine(url)
+        started = time.perf_counter()
+        seed_database(engine, args.books, args.users, args.borrowed_ratio, args.seed)
+        print(
+            f"seeded {args.books} books / {args.users} users "
+            f"in {time.perf_counter() - started:.1f}s ({engine.dialect.name})"
+        )
+
+        results = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "dialect": engine.dialect.name,
+                "books": args.books,
+                "users": args.users,
+                "python": platform.python_version(),
+                "sqlalchemy": sqlalchemy.__version__,
+            },
+            "results": {},
+        }
+        # delete_user runs last, it removes users the other benchmarks may pick
+        calls = {
+            "get_all": args.get_all_calls,
+            "delete_user": args.delete_calls,
+        }
+        for name in args.only or BENCHMARKS:
+            rng = random.Random(args.seed)
+            run = BENCHMARKS[name](engine, args, rng)
+            summary = measure(
+                run, calls.get(name, args.calls), args.warmup, args.repeat
+            )
+            results["results"][name] = summary
+            print(
+                f"{name:<16}p50 {summary['p50_us']:>10.1f} us   "
+                f"p95 {summary['p95_us']:>10.1f} us   ({summary['calls']} calls)"
+            )
+        engine.dispose()
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.compare:
+        failures = compare(
+            results, json.loads(args.compare.read_text()), args.max_regression
+        )
+        if failures:
+            print("\n".join(failures), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
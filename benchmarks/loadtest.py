@@ -0,0 +1,310 @@
+"""
+Load-test the full API: start it under uvicorn against a seeded local
+database and drive a weighted request mix read from a JSONL scenario file.
+
+    uv run python benchmarks/loadtest.py benchmarks/scenarios/mixed.jsonl --workers 1 2 4
+
+Each line of the scenario file is a JSON object. A line with a "config" key
+sets run parameters (books, users, requests, concurrency, seed, ...); every
+other line is an operation:
+
+    {"name": "lookup", "weight": 30, "method": "GET", "path": "/books/{serial}"}
+
+Path and body strings may use the placeholders {serial} (any book),
+{hot_serial} (one of `hot_books` books, to create contention), {card} (any
+user) and {delete_card} (a user not deleted yet in this run). The database is
+reseeded before every worker count, so runs with the same file and seed send
+the same requests.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+from seed import api_path, number, seed_database
+from sqlalchemy import create_engine
+
+DEFAULT_CONFIG = {
+    "books": 10_000,
+    "users": 1_000,
+    "borrowed_ratio": 0.1,
+    "hot_books": 20,
+    "requests": 5_000,
+    "concurrency": 12,
+    "seed": 0,
+}
+
+
+def load_scenario(path: Path):
+    config, operations = dict(DEFAULT_CONFIG), []
+    for line_no, line in enumerate(path.read_text().splitlines(), start=1):
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        if "config" in entry:
+            config.update(entry["config"])
+        elif {"name", "method", "path"} <= entry.keys():
+            entry.setdefault("weight", 1)
+            operations.append(entry)
+        else:
+            raise ValueError(f"{path}:{line_no}: expected config or operation")
+    if not operations:
+        raise ValueError(f"{path}: no operations defined")
+    return config, operations
+
+
+class Placeholders:
+    """
+    Values substituted into request paths and bodies for one load worker.
+    Deterministic for a given seed and worker index; card numbers for
+    {delete_card} are split between workers so each is handed out once.
+    """
+
+    def __init__(self, config: dict, index: int):
+        shared = random.Random(config["seed"])
+        self.books = config["books"]
+        self.users = config["users"]
+        self.hot = shared.sample(
+            range(self.books), min(config["hot_books"], self.books)
+        )
+        self._deletable = shared.sample(range(self.users), self.users)[
+            index :: config["concurrency"]
+        ]
+        self.rng = random.Random(config["seed"] * 1_000_003 + index)
+
+    def render(self, value):
+        if isinstance(value, dict):
+            return {k: self.render(v) for k, v in value.items()}
+        if not isinstance(value, str) or "{" not in value:
+            return value
+        fields = {}
+        if "{serial}" in value:
+            fields["serial"] = number(self.rng.randrange(self.books))
+        if "{hot_serial}" in value:
+            fields["hot_serial"] = number(self.rng.choice(self.hot))
+        if "{card}" in value:
+            fields["card"] = number(self.rng.randrange(self.users))
+        if "{delete_card}" in value:
+            if not self._deletable:
+                # reusing a card would send every later delete to the same user
+                raise RuntimeError(
+                    "ran out of users for {delete_card}; raise users or lower "
+                    "the weight of delete operations in the scenario"
+                )
+            fields["delete_card"] = number(self._deletable.pop())
+        return value.format(**fields)
+
+
+def _percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def drive(base_url: str, config: dict, operations: list) -> dict:
+    weights = [op["weight"] for op in operations]
+    per_worker, extra = divmod(config["requests"], config["concurrency"])
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+
+    async def worker(index: int, client: httpx.AsyncClient):
+        placeholders = Placeholders(config, index)
+        for _ in range(per_worker + (index < extra)):
+            op = placeholders.rng.choices(operations, weights)[0]
+            path = placeholders.render(op["path"])
+            body = placeholders.render(op.get("json"))
+            start = time.perf_counter()
+            try:
+                response = await client.request(op["method"], path, json=body)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies[op["name"]].append(time.perf_counter() - start)
+            statuses[op["name"]][status] += 1
+
+    limits = httpx.Limits(max_connections=config["concurrency"])
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=60
+    ) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i, client) for i in range(config["concurrency"])))
+        elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for name, samples in latencies.items():
+        ordered = sorted(samples)
+        endpoints[name] = {
+            "requests": len(samples),
+            "throughput_rps": len(samples) / elapsed,
+            "mean_ms": statistics.fmean(samples) * 1e3,
+            "p50_ms": _percentile(ordered, 0.50) * 1e3,
+            "p95_ms": _percentile(ordered, 0.95) * 1e3,
+            "p99_ms": _percentile(ordered, 0.99) * 1e3,
+            "status_codes": {str(k): v for k, v in statuses[name].items()},
+        }
+    total = sum(len(s) for s in latencies.values())
+    return {
+        "elapsed_s": elapsed,
+        "throughput_rps": total / elapsed,
+        "endpoints": endpoints,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def pool_settings(concurrency: int) -> dict:
+    """
+    Pool sizing for the API so one worker can hold a connection for every
+    in-flight request. The routes make blocking database calls from the event
+    loop; once more requests wait for a connection than the pool can hand
+    out, the loop blocks and nothing is released until the pool timeout.
+    """
+    pool_size = int(os.getenv("DB_POOL_SIZE", "5"))
+    requested = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    max_overflow = max(requested, concurrency - pool_size)
+    if max_overflow != requested:
+        print(
+            f"raising DB_MAX_OVERFLOW from {requested} to {max_overflow} "
+            f"for concurrency {concurrency}",
+            file=sys.stderr,
+        )
+    return {"DB_POOL_SIZE": str(pool_size), "DB_MAX_OVERFLOW": str(max_overflow)}
+
+
+def start_server(
+    database_url: str, workers: int, port: int, pool: dict
+) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=database_url, **pool)
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=api_path,
+        env=env,
+        start_new_session=True,  # own process group, see stop_server
+    )  # fmt: skip
+
+
+def stop_server(server: subprocess.Popen, timeout: float = 10):
+    # a worker stuck in a blocking call ignores SIGTERM, so the whole group
+    # (master and workers) is killed if it does not exit in time
+    group = os.getpgid(server.pid)
+    server.terminate()
+    try:
+        server.wait(timeout)
+    except subprocess.TimeoutExpired:
+        pass
+    try:
+        os.killpg(group, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    server.wait()
+
+
+def wait_until_ready(base_url: str, server: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health/ready").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"API not ready after {timeout}s")
+
+
+def print_report(workers: int, run: dict):
+    print(
+        f"\nworkers={workers}  {run['throughput_rps']:.0f} req/s "
+        f"in {run['elapsed_s']:.1f}s"
+    )
+    print(
+        f"{'endpoint':<20}{'requests':>9}{'req/s':>9}{'p50 ms':>9}"
+        f"{'p95 ms':>9}{'p99 ms':>9}  status codes"
+    )
+    for name, stats in sorted(run["endpoints"].items()):
+        codes = " ".join(f"{k}:{v}" for k, v in sorted(stats["status_codes"].items()))
+        print(
+            f"{name:<20}{stats['requests']:>9}{stats['throughput_rps']:>9.0f}"
+            f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+            f"  {codes}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[1],
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("scenario", type=Path, help="JSONL scenario file")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1])
+    parser.add_argument(
+        "--database-url",
+        help="defaults to a temporary SQLite file; use Postgres for several workers",
+    )
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    config, operations = load_scenario(args.scenario)
+    # turn SIGTERM into SystemExit so the finally blocks still stop uvicorn
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    pool = pool_settings(config["concurrency"])
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "scenario": str(args.scenario),
+            "config": config,
+            # effective settings of the API under test, after pool_settings
+            "pool": {name: int(value) for name, value in pool.items()},
+        },
+        "runs": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{tmp}/loadtest.db"
+        engine = create_engine(database_url)
+        for workers in args.workers:
+            seed_database(
+                engine,
+                config["books"],
+                config["users"],
+                config["borrowed_ratio"],
+                config["seed"],
+            )
+            engine.dispose()
+            port = _free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            server = start_server(database_url, workers, port, pool)
+            try:
+                wait_until_ready(base_url, server)
+                run = asyncio.run(drive(base_url, config, operations))
+            finally:
+                stop_server(server)
+            results["runs"][str(workers)] = run
+            print_report(workers, run)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Seeding helpers shared by the benchmarks. Serial and card numbers are six
+digits, so at most 1,000,000 books and 1,000,000 users can be created.
+"""
+
+import random
+import sys
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+api_path = Path(__file__).parent.parent / "api"
+sys.path.insert(0, str(api_path))
+
+from modules import dbmodule  # noqa: E402
+
+MAX_KEYS = 1_000_000
+_BATCH_SIZE = 10_000
+
+
+def number(i: int) -> str:
+    return f"{i:06d}"
+
+
+def reset_schema(engine: Engine):
+    dbmodule.Base.metadata.drop_all(engine)
+    dbmodule.Base.metadata.create_all(engine)
+
+
+def seed_database(
+    engine: Engine,
+    books: int,
+    users: int,
+    borrowed_ratio: float = 0.1,
+    random_seed: int = 0,
+):
+    """
+    Recreate the schema and insert `books` books and `users` users with bulk
+    inserts. A `borrowed_ratio` share of books is lent to random users.
+    """
+    if not 0 < books <= MAX_KEYS or not 0 < users <= MAX_KEYS:
+        raise ValueError(f"books and users must be between 1 and {MAX_KEYS}")
+
+    rng = random.Random(random_seed)
+    reset_schema(engine)
+    with engine.begin() as conn:
+        for start in range(0, users, _BATCH_SIZE):
+            conn.execute(
+                insert(dbmodule.User),
+                [
+                    {
+                        "first_name": "First",
+                        "last_name": "Last",
+                        "card_number": number(i),
+                    }
+                    for i in range(start, min(start + _BATCH_SIZE, users))
+                ],
+            )
+        for start in range(0, books, _BATCH_SIZE):
+            rows = []
+            for i in range(start, min(start + _BATCH_SIZE, books)):
+                borrowed = rng.random() < borrowed_ratio
+                rows.append(
+                    {
+                        "serial_number": number(i),
+                        "title": f"Title {i}",
+                        "author": f"Author {i % 5000}",
+                        "is_borrowed": borrowed,
+                        "borrow_date": date(2024, 1, 1) if borrowed else None,
+                        "borrower_card_number": (
+                            number(rng.randrange(users)) if borrowed else None
+                        ),
+                    }
+                )
+            conn.execute(insert(dbmodule.Book), rows)
@@ -1,20 +1,35 @@
+-- serial and card numbers are six digit numbers stored as integers, the API
+-- formats them back to zero-padded strings (KEY_STORAGE=integer)
 CREATE TABLE users(
 	id SERIAL PRIMARY KEY,
 	first_name VARCHAR NOT NULL,
 	last_name VARCHAR NOT NULL,
-	card_number VARCHAR(6) NOT NULL UNIQUE CHECK (card_number ~ '^[0-9]{6}$')
+	card_number INTEGER NOT NULL UNIQUE CHECK (card_number BETWEEN 0 AND 999999)
 );
 
 
 CREATE TABLE IF NOT EXISTS books(
 	id SERIAL PRIMARY KEY,
-	serial_number VARCHAR(6) NOT NULL UNIQUE CHECK (serial_number ~ '^[0-9]{6}$'),
+	serial_number INTEGER NOT NULL UNIQUE CHECK (serial_number BETWEEN 0 AND 999999),
 	author VARCHAR NOT NULL,
 	title VARCHAR NOT NULL,
 	is_borrowed BOOLEAN DEFAULT FALSE,
 	borrow_date DATE,
-	borrower_card_number VARCHAR(6) REFERENCES users(card_number) 
+	borrower_card_number INTEGER REFERENCES users(card_number) 
 );
+CREATE INDEX IF NOT EXISTS ix_books_borrower_card_number ON books(borrower_card_number);
+
+
+-- responses stored for Idempotency-Key replays (IDEMPOTENCY_BACKEND=database)
+CREATE TABLE IF NOT EXISTS idempotency_keys(
+	key VARCHAR(64) PRIMARY KEY,
+	fingerprint VARCHAR(64) NOT NULL,
+	status_code INTEGER,
+	headers TEXT,
+	body BYTEA,
+	created_at TIMESTAMP NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_idempotency_keys_created_at ON idempotency_keys(created_at);
 
 
 -- data population with some data to work with 
@@ -0,0 +1,22 @@
+-- Converts serial and card numbers of a database created with the old
+-- VARCHAR(6) schema to integers. Run once per branch database, then start
+-- the API with KEY_STORAGE=integer (the default):
+--   psql -d library -f database/migrations/001_integer_keys.sql
+BEGIN;
+
+ALTER TABLE books DROP CONSTRAINT IF EXISTS books_borrower_card_number_fkey;
+ALTER TABLE books DROP CONSTRAINT IF EXISTS books_serial_number_check;
+ALTER TABLE users DROP CONSTRAINT IF EXISTS users_card_number_check;
+
+ALTER TABLE users ALTER COLUMN card_number TYPE INTEGER USING card_number::integer;
+ALTER TABLE books ALTER COLUMN serial_number TYPE INTEGER USING serial_number::integer;
+ALTER TABLE books ALTER COLUMN borrower_card_number TYPE INTEGER USING borrower_card_number::integer;
+
+ALTER TABLE users ADD CONSTRAINT users_card_number_check CHECK (card_number BETWEEN 0 AND 999999);
+ALTER TABLE books ADD CONSTRAINT books_serial_number_check CHECK (serial_number BETWEEN 0 AND 999999);
+ALTER TABLE books ADD CONSTRAINT books_borrower_card_number_fkey
+	FOREIGN KEY (borrower_card_number) REFERENCES users(card_number);
+
+CREATE INDEX IF NOT EXISTS ix_books_borrower_card_number ON books(borrower_card_number);
+
+COMMIT;
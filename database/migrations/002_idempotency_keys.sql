@@ -0,0 +1,16 @@
+-- Adds the table used by IDEMPOTENCY_BACKEND=database to a database created
+-- before it existed in init.sql. Only the default branch database needs it:
+--   psql -d library -f database/migrations/002_idempotency_keys.sql
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS idempotency_keys(
+	key VARCHAR(64) PRIMARY KEY,
+	fingerprint VARCHAR(64) NOT NULL,
+	status_code INTEGER,
+	headers TEXT,
+	body BYTEA,
+	created_at TIMESTAMP NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_idempotency_keys_created_at ON idempotency_keys(created_at);
+
+COMMIT;